@@ -14,8 +14,11 @@ import gi
 gi.require_version('Gst', '1.0')
 from gi.repository import Gst, GLib
 
-import threading
-import time
+from log_utils import get_queue_logger
+
+# Queue-backed logger: emitting a record never blocks on stdout, so
+# logging is safe from bus callbacks and streaming threads
+log = get_queue_logger(__name__)
 
 
 class GStreamerController:
@@ -33,10 +36,12 @@ class GStreamerController:
                  camera_height: int = 480,
                  camera_fps: int = 30,
                  inference_width: int = 416,
-                 inference_height: int = 416):
+                 inference_height: int = 416,
+                 inference_fps: int = 10,
+                 capture_format: str = "YUY2"):
         """
         Initialize the controller.
-        
+
         Args:
             camera_device: Path to camera device (e.g., /dev/video0)
             camera_width: Camera capture width
@@ -44,6 +49,9 @@ class GStreamerController:
             camera_fps: Camera frames per second
             inference_width: Width for AI inference input
             inference_height: Height for AI inference input
+            inference_fps: Frame rate cap for the AI inference branch
+            capture_format: Raw camera format (e.g. YUY2), or 'MJPG' for
+                cameras that only deliver compressed JPEG
         """
         # Initialize GStreamer library (must be done once)
         Gst.init(None)
@@ -55,6 +63,8 @@ class GStreamerController:
         self.camera_fps = camera_fps
         self.inference_width = inference_width
         self.inference_height = inference_height
+        self.inference_fps = inference_fps
+        self.capture_format = capture_format
         
         # Pipeline components (will be set when pipeline is built)
         self.pipeline = None
@@ -68,14 +78,25 @@ class GStreamerController:
         self.inference_valve = None   # Controls AI inference branch
         self.appsink = None          # Receives frames for AI processing
         
-        # GLib main loop (processes GStreamer events in background)
-        self.main_loop = None
-        self.glib_thread = None
+        # Running flag (GStreamer events are dispatched from the host
+        # event loop via process_glib_events — no dedicated GLib thread)
         self._running = False
         
         # Detection state
         self._detection_enabled = False
         self._detections = []  # Will store bounding boxes: [(x, y, w, h, label, confidence), ...]
+
+        # Branch bins (preview/detect/inference), filled by build_pipeline
+        self._branches = {}
+
+        # DMABuf io on the hardware JPEG path (saves a memcpy at the
+        # source); cleared and the pipeline rebuilt with mmap io if the
+        # driver fails to actually deliver DMABuf
+        self._use_dmabuf = True
+        # Set by build_pipeline only when io-mode=4 was actually applied
+        # (MJPG + v4l2jpegdec path); the start retry keys on this so a
+        # raw-format failure isn't misread as a DMABuf problem
+        self._dmabuf_active = False
         
     # ========================================
     # PUBLIC API - These are the main methods you'll call
@@ -84,77 +105,169 @@ class GStreamerController:
     def build_pipeline(self):
         """
         Build the complete GStreamer pipeline with all branches.
-        
+
         Pipeline structure:
             camera → decoder → tee (split into 3 branches)
                               ├─> Preview window (always on)
                               ├─> Detection window (valve controlled)
                               └─> AI inference (valve controlled)
-        
+
+        The graph is assembled programmatically (no parse_launch string):
+        properties are set with their real types, missing elements fail
+        with a clear error, and each branch lives in its own Gst.Bin in
+        self._branches so it can be gated at the state level.
+
         This is called once at application startup.
         """
-        print("[PIPELINE] Building pipeline...")
-        
-        # Build the pipeline string
-        # Note: This is a bit long but it's clear what each part does
-        pipeline_str = (
-            # ========== CAMERA SOURCE ==========
-            # Open camera and get MJPEG compressed stream
-            f"v4l2src device={self.camera_device} ! "
-            f"image/jpeg,width={self.camera_width},height={self.camera_height},"
-            f"framerate={self.camera_fps}/1 ! "
-            
-            # Decode JPEG to raw video
-            "jpegdec ! "
-            
-            # Convert to RGB format
-            "videoconvert ! "
-            
-            # Split into multiple branches using 'tee'
-            "tee name=t "
-            
-            # ========== BRANCH 1: PREVIEW WINDOW (Always Active) ==========
-            # This branch always shows clean camera feed
-            "t. ! queue max-size-buffers=1 leaky=downstream ! "
-            "videoconvert ! "
-            "xvimagesink name=preview_sink sync=false "
-            
-            # ========== BRANCH 2: DETECTION WINDOW (Valve Controlled) ==========
-            # This branch shows camera feed with bounding boxes
-            # Valve starts OPEN briefly to let cairooverlay initialize,
-            # then closes automatically
-            "t. ! valve name=detect_valve drop=false ! "  # Start OPEN
-            "queue max-size-buffers=1 leaky=downstream ! "
-            "videoconvert ! "
-            "video/x-raw,format=BGRA ! "  # Cairo needs BGRA format
-            "cairooverlay name=overlay ! "
-            "videoconvert ! "
-            "ximagesink name=detect_sink sync=false "  # Use ximagesink to avoid XVideo conflicts
-            
-            # ========== BRANCH 3: AI INFERENCE (Valve Controlled) ==========
-            # This branch feeds frames to AI model
-            "t. ! valve name=inference_valve drop=true ! "  # Start CLOSED
-            "queue max-size-buffers=1 leaky=downstream ! "
-            "videoconvert ! "
-            "videoscale ! "  # Resize for AI model input
-            f"video/x-raw,format=RGB,width={self.inference_width},height={self.inference_height} ! "
-            "appsink name=inference_sink emit-signals=True max-buffers=1 drop=True"
-        )
-        
-        try:
-            # Parse the string and create the pipeline
-            self.pipeline = Gst.parse_launch(pipeline_str)
-            print("[PIPELINE] ✓ Pipeline created successfully")
-        except Exception as e:
-            raise RuntimeError(f"[PIPELINE] ✗ Failed to create pipeline: {e}")
-        
+        log.info("[PIPELINE] Building pipeline...")
+
+        self.pipeline = Gst.Pipeline.new("yolo")
+
+        # ========== CAMERA SOURCE ==========
+        # Prefer raw capture (YUY2 etc.) — skipping the JPEG encode/decode
+        # round trip saves a heavy DCT pass per frame. MJPG stays available
+        # for cameras that only deliver compressed streams.
+        self._dmabuf_active = False
+        head = [self._make("v4l2src", props={"device": self.camera_device})]
+        if self.capture_format == "MJPG":
+            head.append(self._make_capsfilter(
+                f"image/jpeg,width={self.camera_width},"
+                f"height={self.camera_height},framerate={self.camera_fps}/1"))
+            # Prefer the V4L2 M2M JPEG decoder so the decode runs on the
+            # ISP/codec block instead of CPU libjpeg; fall back to jpegdec
+            if Gst.ElementFactory.find("v4l2jpegdec") is not None:
+                head.append(self._make("jpegparse"))
+                if self._use_dmabuf:
+                    # Pass buffers between camera and decoder as DMABuf
+                    # fds, not mmap'd copies (enum 4 = GST_V4L2_IO_DMABUF)
+                    head[0].set_property("io-mode", 4)
+                    head.append(self._make("v4l2jpegdec", props={
+                        "capture-io-mode": 4, "output-io-mode": 4}))
+                    self._dmabuf_active = True
+                else:
+                    head.append(self._make("v4l2jpegdec"))
+            else:
+                head.append(self._make("jpegdec"))
+        else:
+            head.append(self._make_capsfilter(
+                f"video/x-raw,format={self.capture_format},"
+                f"width={self.camera_width},height={self.camera_height},"
+                f"framerate={self.camera_fps}/1"))
+
+        # Fan out the camera's native format (YUV) directly: each branch
+        # converts only what it needs, instead of one CPU colorspace pass
+        # on the full frame before the tee triples it
+        tee = self._make("tee", "t")
+        head.append(tee)
+
+        for element in head:
+            self.pipeline.add(element)
+        self._link_chain(head)
+
+        # ========== BRANCH 1: PREVIEW WINDOW (Always Active) ==========
+        # This branch always shows clean camera feed
+        preview_branch = self._build_branch("preview_branch", [
+            self._make_queue(),
+            self._make("videoconvert"),
+            # force-aspect-ratio off: window matches the camera aspect,
+            # so letterboxing would just re-blit empty borders per frame
+            # enable-last-sample off everywhere: nobody polls it, and on
+            # it pins the newest frame's buffer in memory per sink
+            self._make(self._pick_display_sink("xvimagesink"), "preview_sink",
+                       {"sync": False, "qos": True,
+                        "force-aspect-ratio": False,
+                        "enable-last-sample": False}),
+        ])
+
+        # ========== BRANCH 2: DETECTION WINDOW (Valve Controlled) ==========
+        # This branch shows camera feed with bounding boxes
+        # Valve starts OPEN briefly to let cairooverlay initialize,
+        # then closes automatically
+        detect_branch = self._build_branch("detect_branch", [
+            self._make_queue(),
+            self._make("videoconvert"),
+            self._make_capsfilter("video/x-raw,format=BGRA"),  # Cairo needs BGRA
+            self._make("cairooverlay", "overlay"),
+            # glimagesink takes BGRA as a texture when GL is available;
+            # otherwise ximagesink accepts BGRA directly on X11 (no second
+            # convert) and avoids XVideo conflicts with the preview window
+            self._make(self._pick_display_sink("ximagesink"), "detect_sink",
+                       {"sync": False, "qos": True,
+                        "force-aspect-ratio": False,
+                        "enable-last-sample": False}),
+        ])
+
+        # ========== BRANCH 3: AI INFERENCE (Valve Controlled) ==========
+        # This branch feeds frames to AI model, rate-capped below the
+        # camera rate so the detector isn't force-fed frames it can
+        # never finish in time
+        inference_branch = self._build_branch("inference_branch", [
+            self._make_queue(),
+            *self._make_inference_scalers(),
+            # emit-signals stays off: every buffer would otherwise pay a
+            # GObject signal emission (and a GIL hop) on the streaming
+            # thread even with no handler connected. Phase 2 consumes
+            # frames by pulling from a worker thread instead.
+            # max-buffers=1 + drop=true + sync=false: the consumer
+            # always gets the freshest frame with no clock waits and
+            # no queue growth when inference falls behind
+            self._make("appsink", "inference_sink",
+                       {"emit-signals": False, "max-buffers": 1, "drop": True,
+                        "sync": False, "enable-last-sample": False}),
+        ])
+
+        # The valves sit BETWEEN the tee and the gated branches (not inside
+        # them): a closed valve stops all buffers before the branch, which
+        # lets us also drop the whole branch bin to READY without the tee
+        # ever pushing into an inactive pad.
+        valves = {
+            "detect": self._make("valve", "detect_valve", {"drop": False}),    # Start OPEN
+            "inference": self._make("valve", "inference_valve", {"drop": True}),  # Start CLOSED
+        }
+
+        # Hook each branch to its own tee src pad (through its valve, if any)
+        self._branches = {
+            "preview": preview_branch,
+            "detect": detect_branch,
+            "inference": inference_branch,
+        }
+        for name, branch in self._branches.items():
+            self.pipeline.add(branch)
+            valve = valves.get(name)
+            head = branch
+            if valve is not None:
+                self.pipeline.add(valve)
+                self._link_chain([valve, branch])
+                head = valve
+            tee_pad = tee.request_pad_simple("src_%u")
+            ret = tee_pad.link(head.get_static_pad("sink"))
+            if ret != Gst.PadLinkReturn.OK:
+                raise RuntimeError(
+                    f"[PIPELINE] ✗ Failed to link tee to {head.name}: {ret.value_nick}")
+
+        # Inference branch stays fully down (state-locked) until detection
+        # is enabled — zero per-frame CPU while it's off
+        inference_branch.set_locked_state(True)
+
+        log.info("[PIPELINE] ✓ Pipeline created successfully")
+
         # Get references to elements we need to control
+        # (get_by_name searches recursively into the branch bins)
         self.preview_sink = self.pipeline.get_by_name("preview_sink")
         self.detect_sink = self.pipeline.get_by_name("detect_sink")
         self.overlay = self.pipeline.get_by_name("overlay")
         self.detect_valve = self.pipeline.get_by_name("detect_valve")
         self.inference_valve = self.pipeline.get_by_name("inference_valve")
         self.appsink = self.pipeline.get_by_name("inference_sink")
+
+        # Bound display lateness: frames more than 15ms late are dropped
+        # instead of rendered, and sinks budget 35ms of processing time.
+        # With qos=true the sinks also send lateness events upstream, so
+        # under load the converters skip frames before doing the work.
+        for sink in (self.preview_sink, self.detect_sink):
+            if sink:
+                sink.set_property('max-lateness', 15 * Gst.MSECOND)
+                sink.set_property('processing-deadline', 35 * Gst.MSECOND)
         
         # Set up message bus to receive pipeline events
         self.bus = self.pipeline.get_bus()
@@ -164,7 +277,7 @@ class GStreamerController:
         # Connect the overlay draw callback
         if self.overlay:
             self.overlay.connect('draw', self._on_overlay_draw)
-            print("[PIPELINE] ✓ Overlay callback connected")
+            log.info("[PIPELINE] ✓ Overlay callback connected")
     
     def start_preview(self):
         """
@@ -177,21 +290,30 @@ class GStreamerController:
         This is called when user clicks "Start Preview" button.
         """
         if self._running:
-            print("[PREVIEW] Already running")
+            log.info("[PREVIEW] Already running")
             return
         
-        print("[PREVIEW] Starting preview mode...")
-        
-        # Create GLib main loop (processes GStreamer events)
-        self.main_loop = GLib.MainLoop()
-        
-        # Start GLib loop in background thread so Qt GUI stays responsive
+        log.info("[PREVIEW] Starting preview mode...")
+
+        # No GLib thread: bus messages and timeouts attach to the default
+        # GLib context, which the host drains via process_glib_events()
+        # (from a Qt timer). A permanently running MainLoop thread costs
+        # constant wakeups for the whole process.
         self._running = True
-        self.glib_thread = threading.Thread(target=self._run_glib, daemon=True)
-        self.glib_thread.start()
-        
+
         # Start the pipeline
         ret = self.pipeline.set_state(Gst.State.PLAYING)
+        if ret == Gst.StateChangeReturn.FAILURE and self._dmabuf_active:
+            # Some drivers advertise DMABuf but fail at streamon —
+            # rebuild once with plain mmap io before giving up
+            log.warning("[PREVIEW] DMABuf io failed; rebuilding with mmap")
+            self.pipeline.set_state(Gst.State.NULL)
+            if self.bus:
+                self.bus.remove_signal_watch()
+            self.pipeline = None
+            self._use_dmabuf = False
+            self.build_pipeline()
+            ret = self.pipeline.set_state(Gst.State.PLAYING)
         if ret == Gst.StateChangeReturn.FAILURE:
             self._running = False
             raise RuntimeError("[PREVIEW] ✗ Failed to start pipeline")
@@ -203,7 +325,7 @@ class GStreamerController:
             self.pipeline.set_state(Gst.State.NULL)
             raise RuntimeError(f"[PREVIEW] ✗ Pipeline stuck in {state.value_nick} state")
         
-        print(f"[PREVIEW] ✓ Pipeline started (state: {state.value_nick})")
+        log.info(f"[PREVIEW] ✓ Pipeline started (state: {state.value_nick})")
         
         # IMPORTANT: Close detection valve after cairooverlay has initialized
         # We started it open so cairooverlay could initialize properly,
@@ -217,33 +339,42 @@ class GStreamerController:
         This is called when user clicks "Stop Preview" or "Stop Detection".
         """
         if not self.pipeline or not self._running:
-            print("[STOP] Pipeline not running")
+            log.info("[STOP] Pipeline not running")
             return
         
-        print("[STOP] Stopping pipeline...")
+        log.info("[STOP] Stopping pipeline...")
         
         # Disable detection if it was enabled
         if self._detection_enabled:
             self._detection_enabled = False
         
+        # Unlock any gated branches so they follow the pipeline to NULL
+        for branch in self._branches.values():
+            branch.set_locked_state(False)
+
         # Stop the pipeline
         self.pipeline.set_state(Gst.State.NULL)
         self.pipeline.get_state(timeout=2 * Gst.SECOND)
-        
-        # Stop GLib loop
-        if self.main_loop and self._running:
-            self.main_loop.quit()
-        
-        # Wait for GLib thread to finish
-        if self.glib_thread and self.glib_thread.is_alive():
-            self.glib_thread.join(timeout=2.0)
-        
-        print("[STOP] ✓ Pipeline stopped")
-        
+
+        # Drain any pending bus messages/timeouts
+        self.process_glib_events()
+
+        log.info("[STOP] ✓ Pipeline stopped")
+
         # Reset state
         self._running = False
-        self.glib_thread = None
-        self.main_loop = None
+
+    def process_glib_events(self):
+        """
+        Dispatch pending GLib events (bus messages, timeouts).
+
+        Call this periodically from the host event loop — e.g. a Qt
+        QTimer at ~60Hz — while the pipeline runs. Non-blocking: returns
+        as soon as the default context has nothing pending.
+        """
+        context = GLib.MainContext.default()
+        while context.pending():
+            context.iteration(False)
     
     def start_detection(self):
         """
@@ -256,31 +387,38 @@ class GStreamerController:
         This is called when user clicks "Start Detection" button.
         """
         if not self._running:
-            print("[DETECTION] ✗ Start preview first!")
+            log.warning("[DETECTION] ✗ Start preview first!")
             return
         
         if self._detection_enabled:
-            print("[DETECTION] Already enabled")
+            log.info("[DETECTION] Already enabled")
             return
         
-        print("[DETECTION] Enabling detection mode...")
-        
+        log.info("[DETECTION] Enabling detection mode...")
+
+        # Bring the gated branches back up before opening the valves
+        for name in ("detect", "inference"):
+            branch = self._branches.get(name)
+            if branch:
+                branch.set_locked_state(False)
+                branch.sync_state_with_parent()
+
         # Open the detection display valve (shows detection window)
         if self.detect_valve:
             self.detect_valve.set_property('drop', False)
-            print("[DETECTION] ✓ Detection window enabled")
+            log.info("[DETECTION] ✓ Detection window enabled")
         
         # Open the inference valve (starts AI processing)
         if self.inference_valve:
             self.inference_valve.set_property('drop', False)
-            print("[DETECTION] ✓ Inference pipeline enabled")
+            log.info("[DETECTION] ✓ Inference pipeline enabled")
         
-        # TODO: In Phase 2, connect appsink signal to process frames
-        # if self.appsink:
-        #     self.appsink.connect('new-sample', self._on_new_frame)
+        # TODO: In Phase 2, start a worker thread that pulls frames with
+        # self.appsink.emit('try-pull-sample', timeout) — no per-frame
+        # signal dispatch (see gstreamer_preview_detect._capture_loop)
         
         self._detection_enabled = True
-        print("[DETECTION] ✓ Detection mode active")
+        log.info("[DETECTION] ✓ Detection mode active")
     
     def stop_detection(self):
         """
@@ -293,40 +431,171 @@ class GStreamerController:
         This is called when user clicks "Stop Detection" button.
         """
         if not self._detection_enabled:
-            print("[DETECTION] Not enabled")
+            log.info("[DETECTION] Not enabled")
             return
         
-        print("[DETECTION] Disabling detection mode...")
+        log.info("[DETECTION] Disabling detection mode...")
         
         # Close the detection display valve (hides detection window)
         if self.detect_valve:
             self.detect_valve.set_property('drop', True)
-            print("[DETECTION] ✓ Detection window disabled")
+            log.info("[DETECTION] ✓ Detection window disabled")
         
         # Close the inference valve (stops AI processing)
         if self.inference_valve:
             self.inference_valve.set_property('drop', True)
-            print("[DETECTION] ✓ Inference pipeline disabled")
-        
+            log.info("[DETECTION] ✓ Inference pipeline disabled")
+
+        # Take the gated branches all the way down: with the valves closed
+        # no buffers reach them, so READY is safe and all their per-frame
+        # CPU work (convert/scale/render) stops entirely
+        for name in ("detect", "inference"):
+            branch = self._branches.get(name)
+            if branch:
+                branch.set_state(Gst.State.READY)
+                branch.set_locked_state(True)
+
         # Clear detection results
         self._detections = []
         
         self._detection_enabled = False
-        print("[DETECTION] ✓ Returned to preview mode")
+        log.info("[DETECTION] ✓ Returned to preview mode")
     
     # ========================================
-    # INTERNAL METHODS - These handle pipeline events
+    # INTERNAL METHODS - Pipeline construction helpers
     # ========================================
-    
-    def _run_glib(self):
+
+    def _make(self, factory_name, element_name=None, props=None):
+        """
+        Create a GStreamer element or fail with a clear error.
+
+        Args:
+            factory_name: Element factory (e.g. 'videoconvert')
+            element_name: Optional instance name for get_by_name lookups
+            props: Optional dict of properties to set (typed, no string
+                   conversion like parse_launch does)
+        """
+        element = Gst.ElementFactory.make(factory_name, element_name)
+        if element is None:
+            raise RuntimeError(
+                f"[PIPELINE] ✗ Missing GStreamer element: {factory_name}")
+        for key, value in (props or {}).items():
+            element.set_property(key, value)
+        return element
+
+    def _make_capsfilter(self, caps_str):
+        """Create a capsfilter restricting the stream to the given caps."""
+        return self._make(
+            "capsfilter", props={"caps": Gst.Caps.from_string(caps_str)})
+
+    def _make_queue(self):
+        """
+        One-frame leaky queue, bounded by time instead of buffer count:
+        a 1-buffer cap can starve the tee (it pushes synchronously) when
+        a consumer stalls even briefly, while a frame-period time cap
+        absorbs that without growing. silent=true turns off the queue's
+        per-buffer overrun/underrun signal emission.
+        """
+        return self._make("queue", props={
+            "max-size-buffers": 0,
+            "max-size-bytes": 0,
+            "max-size-time": int(1e9 / self.camera_fps),  # one frame period
+            "leaky": 2,  # downstream (drop oldest)
+            "silent": True,
+        })
+
+    @staticmethod
+    def _pick_display_sink(fallback):
+        """
+        Best available display sink: glimagesink renders frames as GL
+        textures, skipping the CPU→Xv/X shm copy the X11 sinks pay per
+        displayed frame. Falls back to the given X11 sink.
+        """
+        if Gst.ElementFactory.find("glimagesink") is not None:
+            return "glimagesink"
+        return fallback
+
+    @staticmethod
+    def _pick_scaler():
+        """
+        Best available one-pass convert+scale element for the inference
+        branch: v4l2convert (V4L2 M2M blitter on i.MX/RPi) or
+        vaapipostproc (Intel) resize and convert on fixed-function
+        hardware. None means CPU fallback.
+        """
+        for factory in ("v4l2convert", "vaapipostproc"):
+            if Gst.ElementFactory.find(factory) is not None:
+                return factory
+        return None
+
+    def _make_inference_scalers(self):
+        """
+        Convert/scale/rate elements for the inference branch.
+
+        On Tegra boards nvvidconv does the colorspace conversion and the
+        resize on the VIC hardware (frames stay in NVMM until the final
+        RGB hop); other boards get the _pick_scaler() hardware blitter if
+        one exists, and only then CPU videoconvert/videoscale.
+        """
+        if Gst.ElementFactory.find("nvvidconv") is not None:
+            return [
+                self._make("videorate"),
+                self._make_capsfilter(
+                    f"video/x-raw,framerate={self.inference_fps}/1"),
+                self._make("nvvidconv"),
+                self._make_capsfilter(
+                    f"video/x-raw(memory:NVMM),format=NV12,"
+                    f"width={self.inference_width},height={self.inference_height}"),
+                self._make("nvvidconv"),
+                self._make_capsfilter(
+                    f"video/x-raw,format=RGB,width={self.inference_width},"
+                    f"height={self.inference_height}"),
+            ]
+        scaler = self._pick_scaler()
+        if scaler is not None:
+            return [
+                self._make("videorate"),
+                self._make_capsfilter(
+                    f"video/x-raw,framerate={self.inference_fps}/1"),
+                self._make(scaler),
+                self._make_capsfilter(
+                    f"video/x-raw,format=RGB,width={self.inference_width},"
+                    f"height={self.inference_height}"),
+            ]
+        return [
+            self._make("videoconvert"),
+            self._make("videoscale"),  # Resize for AI model input
+            self._make("videorate"),
+            self._make_capsfilter(
+                f"video/x-raw,format=RGB,width={self.inference_width},"
+                f"height={self.inference_height},framerate={self.inference_fps}/1"),
+        ]
+
+    @staticmethod
+    def _link_chain(elements):
+        """Link a list of elements in order, failing loudly."""
+        for upstream, downstream in zip(elements, elements[1:]):
+            if not upstream.link(downstream):
+                raise RuntimeError(
+                    f"[PIPELINE] ✗ Failed to link "
+                    f"{upstream.name} → {downstream.name}")
+
+    def _build_branch(self, name, elements):
         """
-        Run the GLib main loop in background thread.
-        This processes all GStreamer events (state changes, errors, etc.)
+        Wrap a chain of elements into a named Gst.Bin with a ghosted sink
+        pad, so the whole branch can be state-gated as one unit.
         """
-        try:
-            self.main_loop.run()
-        except Exception as e:
-            print(f"[GLIB] ✗ Loop error: {e}")
+        branch = Gst.Bin.new(name)
+        for element in elements:
+            branch.add(element)
+        self._link_chain(elements)
+        branch.add_pad(
+            Gst.GhostPad.new("sink", elements[0].get_static_pad("sink")))
+        return branch
+
+    # ========================================
+    # INTERNAL METHODS - These handle pipeline events
+    # ========================================
     
     def _on_bus_message(self, bus, message):
         """
@@ -339,24 +608,24 @@ class GStreamerController:
         if msg_type == Gst.MessageType.ERROR:
             # Pipeline error occurred
             err, debug = message.parse_error()
-            print(f"[PIPELINE ERROR] {err}")
-            print(f"[DEBUG] {debug}")
+            log.error(f"[PIPELINE ERROR] {err}")
+            log.error(f"[DEBUG] {debug}")
             self.stop_preview()
             
         elif msg_type == Gst.MessageType.WARNING:
             # Pipeline warning
             warn, debug = message.parse_warning()
-            print(f"[PIPELINE WARNING] {warn}")
+            log.warning(f"[PIPELINE WARNING] {warn}")
             
         elif msg_type == Gst.MessageType.STATE_CHANGED:
             # Pipeline state changed
             if message.src == self.pipeline:
                 old, new, pending = message.parse_state_changed()
-                print(f"[STATE] {old.value_nick} → {new.value_nick}")
+                log.info(f"[STATE] {old.value_nick} → {new.value_nick}")
                 
         elif msg_type == Gst.MessageType.EOS:
             # End of stream
-            print("[PIPELINE] End of stream")
+            log.info("[PIPELINE] End of stream")
             self.stop_preview()
         
         return True
@@ -370,7 +639,13 @@ class GStreamerController:
         """
         if self.detect_valve and not self._detection_enabled:
             self.detect_valve.set_property('drop', True)
-            print("[PIPELINE] ✓ Detection valve closed (preview mode)")
+            # With the valve closed the detect branch sees no buffers, so
+            # park it in READY until detection is actually enabled
+            branch = self._branches.get("detect")
+            if branch:
+                branch.set_state(Gst.State.READY)
+                branch.set_locked_state(True)
+            log.info("[PIPELINE] ✓ Detection valve closed (preview mode)")
         return False  # Don't repeat this callback
     
     def _on_overlay_draw(self, overlay, context, timestamp, duration):
@@ -404,12 +679,12 @@ class GStreamerController:
     def _on_new_frame(self, appsink):
         """
         Process frames from appsink for AI inference.
-        
-        This is called whenever a new frame is available for processing.
-        
+
+        Called from the Phase 2 consumer thread for every pulled frame.
+
         Args:
             appsink: The appsink element
-            
+
         Returns:
             Gst.FlowReturn.OK to continue receiving frames
         """
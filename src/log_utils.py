@@ -0,0 +1,43 @@
+"""
+Queue-based logging shared by the pipeline modules.
+
+print() (and a plain StreamHandler) flushes stdout synchronously, which
+is poison inside GStreamer streaming-thread callbacks — an error storm
+there throttles the pipeline to stdout speed. Records instead go into an
+in-process queue and a single background QueueListener does the actual
+I/O.
+"""
+
+import logging
+import logging.handlers
+import queue
+
+_queue_handler = None
+_listener = None
+
+
+def get_queue_logger(name: str) -> logging.Logger:
+    """
+    Return a logger for `name` backed by the shared logging queue.
+
+    The first call starts the process-wide QueueListener; later calls
+    reuse it. Emitting a record is just a queue put — no syscalls on the
+    caller's thread.
+    """
+    global _queue_handler, _listener
+
+    if _listener is None:
+        log_queue = queue.Queue(-1)
+        stream = logging.StreamHandler()
+        stream.setFormatter(logging.Formatter(
+            "%(asctime)s - %(levelname)s - %(message)s"))
+        _queue_handler = logging.handlers.QueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, stream)
+        _listener.start()
+
+    logger = logging.getLogger(name)
+    if _queue_handler not in logger.handlers:
+        logger.addHandler(_queue_handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
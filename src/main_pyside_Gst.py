@@ -1,6 +1,7 @@
 import os
 import sys
-from PySide6.QtWidgets import (QApplication, QLabel, QPushButton, 
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import (QApplication, QLabel, QPushButton,
                                 QVBoxLayout, QWidget, QMessageBox)
 
 import logging
@@ -11,7 +12,76 @@ logging.basicConfig(
 )
 logger = logging.getLogger("ui")
 
-from gstreamer_controller import GStreamerController
+# ========== Load Configuration ==========
+# Parsed once at import: the env can't change under a running process,
+# and keeping the getenv/int() work out of the Start handlers keeps
+# button clicks free of parsing and syscalls.
+#
+# UI_MODE selects the pipeline backend — one entry point instead of a
+# main file per variant (each duplicate re-imports Qt and GObject,
+# which is real cold-start time and resident memory on the Pi):
+#   "controller" (default) — GStreamerController, two-window demo
+#   "detect"               — GStreamerPreviewDetect, overlay pipeline;
+#                            set MODEL_PATH to bind the YOLO detector
+UI_MODE = os.environ.get("UI_MODE", "controller")
+MODEL_PATH = os.environ.get("MODEL_PATH", "")
+
+CFG = dict(
+    camera_device=os.environ.get("CAMERA_DEVICE", "/dev/video0"),
+    camera_width=int(os.environ.get("DISPLAY_WIDTH", "640")),
+    camera_height=int(os.environ.get("DISPLAY_HEIGHT", "480")),
+    camera_fps=int(os.environ.get("MJPEG_FPS", "30")),
+    inference_width=int(os.environ.get("DETECT_WIDTH", "416")),
+    inference_height=int(os.environ.get("DETECT_HEIGHT", "416")),
+    inference_fps=int(os.environ.get("INFERENCE_FPS", "10")),
+    # Raw camera format, or 'MJPG' for cameras that only deliver
+    # compressed streams
+    capture_format=os.environ.get("CAPTURE_FORMAT", "YUY2"),
+)
+
+
+def _make_backend():
+    """
+    Build the pipeline backend selected by UI_MODE and adapt it to the
+    (start, stop, set_detection, pump) interface the button handlers
+    use. Imports are local so only the chosen backend's module (and,
+    for "detect", onnxruntime) is ever loaded.
+    """
+    if UI_MODE == "detect":
+        from gstreamer_preview_detect import GStreamerPreviewDetect
+
+        app = GStreamerPreviewDetect(
+            camera_device=CFG["camera_device"],
+            mjpeg_width=CFG["camera_width"],
+            mjpeg_height=CFG["camera_height"],
+            mjpeg_fps_num=CFG["camera_fps"],
+            detect_width=CFG["inference_width"],
+            detect_height=CFG["inference_height"],
+            inference_fps=CFG["inference_fps"],
+            capture_format=CFG["capture_format"],
+        )
+        if MODEL_PATH:
+            from yolo_detector import YOLODetectorNMS
+            app.set_detector(YOLODetectorNMS(
+                MODEL_PATH, input_size=CFG["inference_width"]))
+        return (app, app.start, app.stop,
+                app.set_detection_enabled, app.process_glib_events)
+
+    if UI_MODE != "controller":
+        raise ValueError(f"Unknown UI_MODE: {UI_MODE!r}")
+
+    from gstreamer_controller import GStreamerController
+
+    controller = GStreamerController(**CFG)
+
+    def set_detection(enabled):
+        if enabled:
+            controller.start_detection()
+        else:
+            controller.stop_detection()
+
+    return (controller, controller.start_preview, controller.stop_preview,
+            set_detection, controller.process_glib_events)
 
 
 def main():
@@ -36,41 +106,36 @@ def main():
     btn_detect = QPushButton("Start Detection")
     btn_detect.setEnabled(False)  # Disabled until preview starts
     
-    # ========== Load Configuration ==========
-    camera_device = os.environ.get("CAMERA_DEVICE", "/dev/video0")
-    camera_width = int(os.environ.get("DISPLAY_WIDTH", "640"))
-    camera_height = int(os.environ.get("DISPLAY_HEIGHT", "480"))
-    camera_fps = int(os.environ.get("MJPEG_FPS", "30"))
-    inference_width = int(os.environ.get("DETECT_WIDTH", "416"))
-    inference_height = int(os.environ.get("DETECT_HEIGHT", "416"))
-    
-    # ========== Create GStreamer Controller ==========
-    controller = GStreamerController(
-        camera_device=camera_device,
-        camera_width=camera_width,
-        camera_height=camera_height,
-        camera_fps=camera_fps,
-        inference_width=inference_width,
-        inference_height=inference_height
-    )
-    
+    # ========== Create Pipeline Backend ==========
+    backend, start_pipeline, stop_pipeline, set_detection, pump = \
+        _make_backend()
+
     # Build the pipeline once at startup
     try:
-        controller.build_pipeline()
+        backend.build_pipeline()
         logger.info("Pipeline built successfully")
     except Exception as e:
         logger.error(f"Failed to build pipeline: {e}")
         QMessageBox.critical(window, "Error", f"Failed to build pipeline:\n{e}")
         sys.exit(1)
-    
+
+    # ========== GLib Event Pump ==========
+    # Neither backend runs a GLib thread: we drain the default GLib
+    # context (bus messages, timeouts) from the Qt event loop at ~60Hz,
+    # and only while the pipeline is running.
+    glib_timer = QTimer(window)
+    glib_timer.setInterval(16)
+    glib_timer.timeout.connect(pump)
+
     # ========== Button Click Handlers ==========
-    
+
     def on_preview_clicked():
         """Handle Preview button click"""
         if btn_preview.text() == "Start Preview":
             # Start preview mode
             try:
-                controller.start_preview()
+                start_pipeline()
+                glib_timer.start()
                 btn_preview.setText("Stop Preview")
                 btn_detect.setEnabled(True)
                 btn_detect.setText("Start Detection")
@@ -85,7 +150,8 @@ def main():
         else:
             # Stop preview/detection
             try:
-                controller.stop_preview()
+                stop_pipeline()
+                glib_timer.stop()
                 btn_preview.setText("Start Preview")
                 btn_detect.setEnabled(False)
                 btn_detect.setText("Start Detection")
@@ -100,7 +166,7 @@ def main():
         if btn_detect.text() == "Start Detection":
             # Enable detection mode
             try:
-                controller.start_detection()
+                set_detection(True)
                 btn_detect.setText("Stop Detection")
                 status_label.setText("Status: Detection Mode (2 windows)")
                 status_label.setStyleSheet("color: blue;")
@@ -111,7 +177,7 @@ def main():
         else:
             # Disable detection mode (return to preview)
             try:
-                controller.stop_detection()
+                set_detection(False)
                 btn_detect.setText("Start Detection")
                 status_label.setText("Status: Preview Mode (1 window)")
                 status_label.setStyleSheet("color: green;")
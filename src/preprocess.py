@@ -0,0 +1,76 @@
+"""
+Fused YOLO input preprocessing: HWC uint8 frame → normalized CHW float32.
+
+Done naively (astype(float32)/255.0 then transpose) this is three passes
+over the frame plus a fresh allocation per call. The kernel here makes a
+single pass and writes straight into a preallocated destination tensor.
+Backends, best available first: a parallel Numba loop fusing load,
+normalize and transposed store; OpenCV's blobFromImage (hand-tuned
+NEON/SSE C); and a NumPy fallback that still runs allocation-free
+(transpose is a view, one streaming multiply per plane). Numba and
+OpenCV both stay optional — nothing else in the app requires them.
+"""
+
+import numpy as np
+
+try:
+    import numba
+    HAVE_NUMBA = True
+except ImportError:
+    numba = None
+    HAVE_NUMBA = False
+
+try:
+    import cv2
+    HAVE_CV2 = True
+except ImportError:
+    cv2 = None
+    HAVE_CV2 = False
+
+_INV_255 = np.float32(1.0 / 255.0)
+
+
+if HAVE_NUMBA:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _hwc_u8_to_chw_f32_numba(src, dst):
+        height, width, _ = src.shape
+        for y in numba.prange(height):
+            for x in range(width):
+                dst[0, y, x] = src[y, x, 0] * (1.0 / 255.0)
+                dst[1, y, x] = src[y, x, 1] * (1.0 / 255.0)
+                dst[2, y, x] = src[y, x, 2] * (1.0 / 255.0)
+
+
+def _hwc_u8_to_chw_f32_cv2(src, dst):
+    # blobFromImage fuses the scale and the HWC→CHW shuffle in one
+    # hand-tuned NEON/SSE kernel, but always allocates its output — so a
+    # contiguous copy into dst remains. The C pass plus a straight
+    # memcpy still beats NumPy's strided multiply through the transpose
+    # view, especially on ARM.
+    blob = cv2.dnn.blobFromImage(src, 1.0 / 255.0, swapRB=False, crop=False)
+    np.copyto(dst, blob[0])
+
+
+def _hwc_u8_to_chw_f32_numpy(src, dst):
+    # transpose(2,0,1) is a zero-copy view; multiply streams uint8 →
+    # normalized float32 directly into dst (casting='unsafe' allows the
+    # dtype change without an intermediate array)
+    np.multiply(src.transpose(2, 0, 1), _INV_255, out=dst, casting="unsafe")
+
+
+def hwc_u8_to_chw_f32(src, dst):
+    """
+    Fill dst, a (3, H, W) float tensor (float32 or float16), from src,
+    an (H, W, 3) uint8 frame, normalizing to [0, 1]. Neither array is
+    allocated here — callers preallocate dst once and reuse it every
+    frame.
+    """
+    # The Numba kernel is compiled for float32 stores; float16
+    # destinations (FP16 models) take the cv2/NumPy paths, which cast
+    # on the final write.
+    if HAVE_NUMBA and dst.dtype == np.float32:
+        _hwc_u8_to_chw_f32_numba(src, dst)
+    elif HAVE_CV2:
+        _hwc_u8_to_chw_f32_cv2(src, dst)
+    else:
+        _hwc_u8_to_chw_f32_numpy(src, dst)
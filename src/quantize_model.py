@@ -0,0 +1,112 @@
+"""
+Offline static INT8 quantization for the YOLO model.
+
+Run this once on a workstation (not on the device at startup) to turn
+the FP32 export into an INT8 one:
+
+    python quantize_model.py --model current.onnx --output current_int8.onnx \
+        --calib-dir calibration_frames/
+
+Why: on ARMv8.2 (Pi 5) the MLAS INT8 kernels use SDOT for four int8
+MACs per lane, and weight bandwidth drops to a quarter of FP32 — the
+conv layers that dominate YOLO inference scale with both. The NMS op
+baked into the model is left untouched (quantize_static excludes it by
+default), so the (1, 300, 6) output contract and YOLODetectorNMS are
+unchanged — only MODEL_PATH needs to point at the new file.
+
+Calibration wants 100-300 frames that look like what the camera will
+see; each image is resized and normalized exactly the way
+YOLODetectorNMS.preprocess does, so the activation ranges the
+quantizer observes match runtime.
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+import numpy as np
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    QuantType,
+    quantize_static,
+)
+
+from preprocess import hwc_u8_to_chw_f32
+
+
+class FrameCalibrationReader(CalibrationDataReader):
+    """
+    Feeds calibration frames to quantize_static one at a time.
+
+    Takes a directory of images (any format OpenCV can read), resizes
+    each to the model's input size and normalizes it through the same
+    preprocess kernel the detector uses at runtime.
+    """
+
+    def __init__(self, calib_dir: str, input_name: str, input_size: int):
+        import cv2  # only needed offline, so imported here
+
+        self._cv2 = cv2
+        self._input_name = input_name
+        self._input_size = input_size
+        self._paths = iter(sorted(
+            p for pattern in ("*.jpg", "*.jpeg", "*.png", "*.bmp")
+            for p in glob.glob(os.path.join(calib_dir, pattern))))
+        # One reused tensor, same as the detector's input_array
+        self._tensor = np.zeros(
+            (1, 3, input_size, input_size), dtype=np.float32)
+
+    def get_next(self):
+        for path in self._paths:
+            image = self._cv2.imread(path)
+            if image is None:
+                continue
+            image = self._cv2.cvtColor(image, self._cv2.COLOR_BGR2RGB)
+            image = self._cv2.resize(
+                image, (self._input_size, self._input_size))
+            hwc_u8_to_chw_f32(image, self._tensor[0])
+            return {self._input_name: self._tensor}
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Statically quantize the YOLO ONNX model to INT8")
+    parser.add_argument("--model", required=True,
+                        help="FP32 ONNX model to quantize")
+    parser.add_argument("--output", required=True,
+                        help="Where to write the INT8 model")
+    parser.add_argument("--calib-dir", required=True,
+                        help="Directory of representative camera frames")
+    parser.add_argument("--input-size", type=int, default=416,
+                        help="Model input size (default 416)")
+    args = parser.parse_args()
+
+    import onnxruntime as ort
+    input_name = ort.InferenceSession(
+        args.model, providers=["CPUExecutionProvider"]
+    ).get_inputs()[0].name
+
+    reader = FrameCalibrationReader(
+        args.calib_dir, input_name, args.input_size)
+
+    # QInt8 weights and activations, per-channel weight scales (cheap at
+    # load time, noticeably better accuracy for conv), full int8 range —
+    # reduce_range is an x86 VPMADDUBSW workaround ARM doesn't need.
+    quantize_static(
+        args.model,
+        args.output,
+        reader,
+        activation_type=QuantType.QInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        reduce_range=False,
+    )
+
+    print(f"Wrote {args.output}")
+    print("Point MODEL_PATH at it to use the INT8 model.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())